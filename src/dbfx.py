@@ -80,8 +80,162 @@ def insert_rows(table_name, rows):
     if not conn.closed:
         conn.commit()
         conn.close()
-            
-        
+
+
+
+# Table name -> list of (column name, has default) tuples, filled by get_table_columns()
+table_columns_cache = {}
+
+# Set after a bulk load fails, so the rest of the process uses insert_rows() instead
+# of writing a file and failing the same way for every game
+bulk_insert_disabled = False
+
+
+def get_table_columns(table_name):
+    """
+    Returns the columns of a table in ordinal order, as (column name, has default) tuples.
+    BULK INSERT maps fields to columns by position, so the bulk file has to be written in
+    this order. Results are cached per table for the life of the process.
+    """
+    if table_name in table_columns_cache:
+        return table_columns_cache[table_name]
+
+    conn = connect_to_db()
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT c.name, CASE WHEN c.default_object_id <> 0 THEN 1 ELSE 0 END "
+            "FROM sys.columns c WHERE c.object_id = OBJECT_ID(?) ORDER BY c.column_id",
+            table_name
+        )
+        columns = [(row[0], bool(row[1])) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+    if columns:
+        table_columns_cache[table_name] = columns
+
+    return columns
+
+
+def format_bulk_value(val):
+    # Empty fields are loaded as NULL when KEEPNULLS is set. The character format has
+    # no way to tell an empty string from NULL, so empty strings are loaded as NULL too.
+    if val is None or val == 'NULL':
+        return ''
+    if isinstance(val, bool):
+        return '1' if val else '0'
+    # Field and row terminators can't appear inside a value
+    return str(val).replace('\t', ' ').replace('\r', ' ').replace('\n', ' ')
+
+
+def write_bulk_file(file_path, rows, columns):
+    """
+    Writes rows to a tab-delimited UTF-8 file for BULK INSERT, one row at a time so
+    the whole file is never held in memory. Columns missing from a row are written
+    as empty fields.
+
+    Args:
+        file_path (str): Path of the file to write.
+        rows (iterable): Dictionaries of column name -> value.
+        columns (list): Column names in the order of the target table.
+
+    Returns:
+        int: The number of rows written.
+    """
+    row_count = 0
+
+    with open(file_path, 'w', encoding='utf-8', newline='') as f:
+        for row in rows:
+            f.write('\t'.join(format_bulk_value(row.get(col)) for col in columns))
+            f.write('\n')
+            row_count += 1
+
+    return row_count
+
+
+def bulk_insert_rows(table_name, rows):
+    """
+    Loads rows into a staging table with BULK INSERT instead of INSERT statements.
+    The rows are written to a delimited file in BULK_LOAD_DIR, which must be readable
+    by the SQL Server service. TABLOCK is used so the load is minimally logged when
+    the database recovery model allows it.
+
+    Unlike insert_rows(), empty string values are loaded as NULL.
+
+    Every table column is written to the file, so columns that no row supplies are
+    empty fields. To match insert_rows(), which leaves those columns out so their
+    defaults apply, KEEPNULLS is dropped when any of them has a default. Without
+    KEEPNULLS an empty value in a supplied column would also get the default instead
+    of NULL, so if a supplied column with a default has empty values as well, the rows
+    are loaded with insert_rows().
+
+    Falls back to insert_rows() if BULK_LOAD_DIR is not set or the bulk load fails.
+    After a failure the bulk path is turned off for the rest of the process.
+    Batches committed before a failure are truncated first, so this should only be
+    used for staging tables that are truncated before each load anyway.
+
+    Args:
+        table_name (str): Target table, e.g. 'raw.Pitch'.
+        rows (list): Dictionaries of column name -> value.
+    """
+    global bulk_insert_disabled
+
+    if not rows:
+        return
+
+    bulk_load_dir = os.getenv('BULK_LOAD_DIR')
+    if not bulk_load_dir or bulk_insert_disabled:
+        insert_rows(table_name, rows)
+        return
+
+    batch_size = int(os.getenv('BULK_INSERT_BATCH_SIZE', 100000))  # Default to 100000 if not set
+    file_path = os.path.join(bulk_load_dir, f"{ table_name.replace('.', '_') }.tsv")
+    bulk_started = False
+
+    try:
+        table_columns = get_table_columns(table_name)
+        columns = [col for col, has_default in table_columns]
+        default_columns = {col for col, has_default in table_columns if has_default}
+
+        # Any row column the table doesn't have would otherwise be silently dropped
+        supplied = {key for row in rows for key in row.keys()}
+        missing = supplied - set(columns)
+        if not columns or missing:
+            raise ValueError(f"columns not found in {table_name}: {sorted(missing)}")
+
+        # Defaults apply to the columns no row supplies only if KEEPNULLS is left out
+        keep_nulls = not (default_columns - supplied)
+        if not keep_nulls:
+            empty_default_columns = {col for col in default_columns & supplied
+                                     if any(format_bulk_value(row.get(col)) == '' for row in rows)}
+            if empty_default_columns:
+                insert_rows(table_name, rows)
+                return
+
+        write_bulk_file(file_path, rows, columns)
+
+        # Only quotes need escaping in the path; sanitize_value() would also change '--'
+        escaped_path = file_path.replace("'", "''")
+        sql = (
+            f"BULK INSERT {table_name} FROM '{ escaped_path }' "
+            f"WITH (FIELDTERMINATOR = '\\t', ROWTERMINATOR = '0x0a', CODEPAGE = '65001', "
+            f"{ 'KEEPNULLS, ' if keep_nulls else '' }TABLOCK, BATCHSIZE = { batch_size })"
+        )
+        bulk_started = True
+        execute_non_query(sql)
+
+    except Exception as e:
+        print(f"Bulk insert into {table_name} failed, using insert_rows for the rest of the run: {e}")
+        bulk_insert_disabled = True
+        if bulk_started:
+            execute_non_query(f"TRUNCATE TABLE {table_name}")
+        insert_rows(table_name, rows)
+
+    finally:
+        if os.path.exists(file_path):
+            os.remove(file_path)
 
 
 
@@ -114,6 +268,98 @@ def create_table(table_name, rows, drop_if_exists):
         conn.close()        
 
 
+# Player, team, and venue tables extracted from the game feeds. Each entity is staged in
+# raw.<name> and upserted into dbo.<name> by dbo.usp_Load_<name>. Teams are keyed by
+# season as well, because a team id keeps its id when the team moves or is renamed.
+DIMENSION_TABLES = {
+    'Player': (['playerId'], ['fullName', 'firstName', 'lastName', 'useName', 'boxscoreName',
+                            'primaryNumber', 'birthDate', 'birthCity', 'birthStateProvince',
+                            'birthCountry', 'height', 'weight', 'active', 'primaryPositionCode',
+                            'batSide', 'pitchHand', 'mlbDebutDate']),
+    'Team':   (['teamId', 'season'], ['name', 'teamName', 'shortName', 'abbreviation', 'teamCode',
+                          'locationName', 'firstYearOfPlay', 'leagueId', 'divisionId',
+                          'venueId', 'active']),
+    'Venue':  (['venueId'], ['name', 'city', 'stateAbbrev', 'country', 'timeZone', 'capacity',
+                           'turfType', 'roofType', 'active']),
+}
+
+
+def create_dimension_tables():
+    """
+    Creates the raw and dbo player, team, and venue tables if they don't already exist,
+    and creates or updates their load procedures. The load procedures upsert from the
+    raw table, and only replace an existing row if the staged row's lastModified is at
+    least as recent, so an older game feed can't overwrite newer values.
+
+    Every worker runs this at start-up, so the statements run under an application lock
+    to keep two workers from creating the same table at the same time.
+    """
+    statements = []
+
+    for name, (key_cols, columns) in DIMENSION_TABLES.items():
+        key_defs = ', '.join(f'[{col}] INT NOT NULL' for col in key_cols)
+        col_defs = ', '.join(f'[{col}] NVARCHAR(255) NULL' for col in columns + ['lastModified'])
+        primary_key = ', '.join(f'[{col}]' for col in key_cols)
+
+        for table_name in [f'raw.{name}', f'dbo.{name}']:
+            pk_def = f', PRIMARY KEY ({primary_key})' if table_name.startswith('dbo.') else ''
+            statements.append(f"IF OBJECT_ID('{table_name}', 'U') IS NULL "
+                              f"CREATE TABLE {table_name} ({key_defs}, {col_defs}{pk_def})")
+
+        all_cols = key_cols + columns + ['lastModified']
+        on_str = ' AND '.join(f't.[{col}] = s.[{col}]' for col in key_cols)
+        update_str = ', '.join(f't.[{col}] = s.[{col}]' for col in columns + ['lastModified'])
+        insert_str = ', '.join(f'[{col}]' for col in all_cols)
+        values_str = ', '.join(f's.[{col}]' for col in all_cols)
+
+        statements.append(f"""CREATE OR ALTER PROCEDURE dbo.usp_Load_{name}
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    MERGE dbo.{name} AS t
+    USING raw.{name} AS s
+        ON {on_str}
+    WHEN MATCHED AND (t.lastModified IS NULL OR s.lastModified >= t.lastModified) THEN
+        UPDATE SET {update_str}
+    WHEN NOT MATCHED BY TARGET THEN
+        INSERT ({insert_str}) VALUES ({values_str});
+END""")
+
+    execute_with_app_lock('create_dimension_tables', statements)
+
+
+def execute_with_app_lock(lock_name, statements):
+    """
+    Runs statements one after another on a single connection while holding an exclusive
+    application lock (sp_getapplock), so other processes running the same statements
+    under the same lock name wait instead of racing, e.g. on IF OBJECT_ID(...) IS NULL
+    CREATE TABLE.
+
+    Args:
+        lock_name (str): Name of the application lock.
+        statements (list): SQL statements to run, each committed after it runs.
+    """
+    conn = connect_to_db()
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("EXEC sp_getapplock @Resource = ?, @LockMode = 'Exclusive', "
+                       "@LockOwner = 'Session', @LockTimeout = -1", lock_name)
+        for sql in statements:
+            cursor.execute(sql)
+            conn.commit()
+        cursor.execute("EXEC sp_releaseapplock @Resource = ?, @LockOwner = 'Session'", lock_name)
+    finally:
+        # Closing the connection also releases the lock if a statement failed
+        conn.close()
+
+
+def is_duplicate_error(e):
+    # SQL Server errors for an object that already exists (2714) or a duplicate key (2627, 2601)
+    return any(f"({number})" in str(e) for number in (2714, 2627, 2601))
+
+
 def execute_non_query(sql):
     conn = connect_to_db()
 
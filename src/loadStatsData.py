@@ -5,16 +5,60 @@ import os
 import utilfx
 from datetime import datetime
 import time
+from collections import OrderedDict
+import socket
+import queuefx
 
 
 
 season = 1958
 season_stop = 1935
 
+# Players, teams, and venues already loaded. Kept across seasons so each one is only
+# loaded again when its values change.
+dimension_cache = OrderedDict()
+dimension_cache_size = int(os.getenv('DIMENSION_CACHE_SIZE', 100000))  # Default to 100000 if not set
 
-while season >= season_stop:
+
+def is_newer_or_same(last_modified, current_last_modified):
+    # A feed without a timestamp never replaces one that has a timestamp
+    if last_modified is None:
+        return current_last_modified is None
+    if current_last_modified is None:
+        return True
+    return current_last_modified <= last_modified
+
+
+def lease_is_lost(lease_lost, season):
+    # Another worker may already be loading this season, so stop before touching the database
+    if lease_lost is not None and lease_lost.is_set():
+        logging.error(f"Lost the queue lease on the { season } season. Stopping.")
+        print(f"Lost the queue lease on the { season } season. Stopping.")
+        return True
+    return False
+
+
+def load_season(season, worker_id = None, lease_lost = None):
+    """
+        Downloads, parses, and loads the games for one season.
+
+        :param season: The MLB season year (e.g., 2025)
+        :param worker_id: The queue worker processing this season, or None when running without the queue.
+                          Each worker downloads to its own subdirectory of GAMES_DOWNLOAD_DIR.
+        :param lease_lost: A threading.Event set by the queue heartbeat if the lease on this season
+                           is lost, or None when running without the queue.
+        :return: True if the season was loaded, otherwise False.
+    """
 
     GAMES_DOWNLOAD_DIR = os.getenv('GAMES_DOWNLOAD_DIR')
+    if worker_id is not None:
+        GAMES_DOWNLOAD_DIR = os.path.join(GAMES_DOWNLOAD_DIR, worker_id)
+        os.makedirs(GAMES_DOWNLOAD_DIR, exist_ok=True)
+
+    # Passthrough saves the game feeds as downloaded, without parsing them first
+    GAMES_DOWNLOAD_PASSTHROUGH = os.getenv('GAMES_DOWNLOAD_PASSTHROUGH', '0') == '1'
+    GAMES_DOWNLOAD_COMPRESS = GAMES_DOWNLOAD_PASSTHROUGH and os.getenv('GAMES_DOWNLOAD_COMPRESS', '0') == '1'
+    GAME_FILE_EXTENSION = '.json.gz' if GAMES_DOWNLOAD_COMPRESS else '.json'
 
 
     """ 
@@ -43,14 +87,23 @@ while season >= season_stop:
     if games is None:
         logging.error(f"Failed to retrieve game list for the { season } season. Exiting.")
         print(f"Failed to retrieve game list for the { season } season. Exiting.")
-        break
+        return False
+
+    if lease_is_lost(lease_lost, season):
+        return False
 
-    # Truncate and reload the raw.Game table
-    dbfx.execute_non_query("TRUNCATE TABLE raw.Game")
-    dbfx.insert_rows('raw.Game', games)
+    # Truncate and reload the raw.Game table. The staging tables are shared by all
+    # queue workers, so only one worker loads them at a time.
+    with queuefx.staging_lock(worker_id, lease_lost) as locked:
+        # The lease may have been lost while waiting for the lock
+        if lease_is_lost(lease_lost, season) or not locked:
+            return False
 
-    # Load staged the data into the dbo.Game table
-    dbfx.execute_non_query("EXEC dbo.usp_Load_Game")
+        dbfx.execute_non_query("TRUNCATE TABLE raw.Game")
+        dbfx.insert_rows('raw.Game', games)
+
+        # Load staged the data into the dbo.Game table
+        dbfx.execute_non_query("EXEC dbo.usp_Load_Game")
 
 
     
@@ -69,9 +122,15 @@ while season >= season_stop:
         # skip downloading detail for suspended, postponed, and cancelled games
         if game['detailedState'] != 'Suspended' and game['detailedState'] != 'Postponed' and game['detailedState'] != 'Cancelled':
             game_id = game['gameId']
+
+            if lease_is_lost(lease_lost, season):
+                return False
         
             # Download the game details
-            success = mlbfx.downloadGameDetail(game_id, GAMES_DOWNLOAD_DIR)
+            success = mlbfx.downloadGameDetail(game_id, GAMES_DOWNLOAD_DIR,
+                                               passthrough = GAMES_DOWNLOAD_PASSTHROUGH,
+                                               compress = GAMES_DOWNLOAD_COMPRESS,
+                                               file_prefix = f"{ season }_")
             if not success:
                 logging.error(f"Failed to download game detail for game ID: { game_id }")
                 print(f"Failed to download game detail for game ID: { game_id }")
@@ -83,7 +142,7 @@ while season >= season_stop:
     if file_error:
         logging.error("One or more game detail files failed to download. Exiting.")
         print("One or more game detail files failed to download. Exiting.")
-        break
+        return False
 
 
 
@@ -95,40 +154,90 @@ while season >= season_stop:
     logging.info(f"Processing game details for the { season } season from downloaded game files")
     print(f"Processing game details for the { season } season from downloaded game files")
 
+    # Keyed by the same keys as the dimension cache, e.g. ('player', 660271) or ('team', 119, 1957),
+    # so an entity changed mid-season is only staged once, with the latest values
+    staged_dimensions = {name: {} for name in dbfx.DIMENSION_TABLES}
+
     for filename in os.listdir(GAMES_DOWNLOAD_DIR):
-        if filename.endswith('.json'):
+        if filename.startswith(str(season)) and filename.endswith(GAME_FILE_EXTENSION):
+            if lease_is_lost(lease_lost, season):
+                return False
+
             file_path = os.path.join(GAMES_DOWNLOAD_DIR, filename)
 
-            # Truncate the raw.AtBat and raw.Pitch tables to prepare for new data
-            dbfx.execute_non_query("TRUNCATE TABLE raw.AtBat")
-            dbfx.execute_non_query("TRUNCATE TABLE raw.Pitch")
-                    
-            # Process each game detail file
-            game_detail = mlbfx.getAtBats(file_path)
+            # Parse the file once and share it between the at-bat, pitch, and dimension extractors.
+            # Parsing happens outside the staging lock so workers only wait on each other for the load.
+            game_data = utilfx.load_json(file_path)
+            game_detail = mlbfx.getAtBats(game_data)
+            pitches = mlbfx.getPitches(game_data)
+            dimensions = mlbfx.getDimensions(game_data, dimension_cache)
+
+            with queuefx.staging_lock(worker_id, lease_lost) as locked:
+                # The lease may have been lost while waiting for the lock
+                if lease_is_lost(lease_lost, season) or not locked:
+                    return False
+
+                # Truncate the raw.AtBat and raw.Pitch tables to prepare for new data
+                dbfx.execute_non_query("TRUNCATE TABLE raw.AtBat")
+                dbfx.execute_non_query("TRUNCATE TABLE raw.Pitch")
 
-            if game_detail:
-                # Insert the game detail into the staging table
-                dbfx.insert_rows('raw.AtBat', game_detail)
+                if game_detail:
+                    # Insert the game detail into the staging table
+                    dbfx.bulk_insert_rows('raw.AtBat', game_detail)
 
-                # Load the game detail into the main table
-                dbfx.execute_non_query("EXEC dbo.usp_Load_AtBat")
+                    # Load the game detail into the main table
+                    dbfx.execute_non_query("EXEC dbo.usp_Load_AtBat")
                 
-            else:
-                logging.warning(f"No game detail found for file: { filename }")
+                else:
+                    logging.warning(f"No game detail found for file: { filename }")
+
+                if pitches:
+                    # Insert the pitches into the staging table
+                    dbfx.bulk_insert_rows('raw.Pitch', pitches)
+
+                    # Load the pitches into the main table
+                    dbfx.execute_non_query("EXEC dbo.usp_Load_Pitch")
+
+                else:
+                    logging.warning(f"No pitches found for file: { filename }")
+
+            # Collect new or changed players, teams, and venues from this game
+            for name, (key_cols, columns) in dbfx.DIMENSION_TABLES.items():
+                rows = staged_dimensions[name]
+                for row in dimensions[name.lower() + 's']:
+                    key = (name.lower(),) + tuple(row[col] for col in key_cols)
+                    current = rows.get(key)
+                    if current is None or is_newer_or_same(row['lastModified'], current['lastModified']):
+                        rows[key] = row
+
+
+
+    """
+        Load the players, teams, and venues collected from the game files for this season
+    """
 
-            # Using the same file path, get the pitches for this game
-            pitches = mlbfx.getPitches(file_path)
+    dimension_counts = ', '.join(f"{ len(rows) } { name.lower() }s" for name, rows in staged_dimensions.items())
+    logging.info(f"Loading { dimension_counts } for the { season } season")
+    print(f"Loading { dimension_counts } for the { season } season")
 
-            if pitches:
-                # Insert the pitches into the staging table
-                dbfx.insert_rows('raw.Pitch', pitches)
+    if lease_is_lost(lease_lost, season):
+        return False
 
-                # Load the pitches into the main table
-                dbfx.execute_non_query("EXEC dbo.usp_Load_Pitch")
+    with queuefx.staging_lock(worker_id, lease_lost) as locked:
+        # The lease may have been lost while waiting for the lock
+        if lease_is_lost(lease_lost, season) or not locked:
+            return False
 
-            else:
-                logging.warning(f"No pitches found for file: { filename }")
+        for name, rows in staged_dimensions.items():
+            if rows:
+                dbfx.execute_non_query(f"TRUNCATE TABLE raw.{ name }")
+                dbfx.bulk_insert_rows(f"raw.{ name }", list(rows.values()))
+                dbfx.execute_non_query(f"EXEC dbo.usp_Load_{ name }")
 
+                # Only cache entities once they're loaded, so a failed season doesn't skip them on retry
+                for key, row in rows.items():
+                    values = {k: v for k, v in row.items() if k != 'lastModified'}
+                    utilfx.mark_seen(dimension_cache, key, row['lastModified'], values, dimension_cache_size)
 
 
 
@@ -147,7 +256,7 @@ while season >= season_stop:
     # Move downloaded files to the archive directory
     utilfx.move_files(source_dir = GAMES_DOWNLOAD_DIR, 
                     destination_dir = GAMES_ARCHIVE_DIR, 
-                    extension = ".json")
+                    extension = GAME_FILE_EXTENSION)
     
     
 
@@ -158,7 +267,7 @@ while season >= season_stop:
 
     # Create a zip archive of the game detail files for the season, and delete the original JSON files.
     archive_dir = GAMES_ARCHIVE_DIR
-    file_pattern = str(season) + '*.json'
+    file_pattern = str(season) + '*' + GAME_FILE_EXTENSION
     archive_filename = os.path.join(archive_dir, "game_detail_" + str(season) + ".zip")
 
     utilfx.archive_files(archive_dir, file_pattern, archive_filename)
@@ -168,8 +277,11 @@ while season >= season_stop:
     logging.info(f"**** Completed processing of game details for the { season } season ****")
     print(f"\n**** Completed processing of game details for the { season } season ****\n")
 
-    season -= 1
+    return True
 
+
+
+def sleep_between_seasons():
     # Sleep to avoid overwhelming the API with requests
     sleep_duration_minutes = 1
     
@@ -177,3 +289,67 @@ while season >= season_stop:
     print(f"Sleeping for { sleep_duration_minutes  } minutes to avoid getting locked out of the API\n\n")
 
     time.sleep((sleep_duration_minutes * 60))
+
+
+
+def run_queue_worker():
+    """
+        Runs as one worker in a shared backfill. Seasons from season down to season_stop are
+        added to the work queue (if they aren't already there), and this worker claims and
+        loads seasons until the queue is empty. Start this on as many machines as needed.
+    """
+    worker_id = f"{ socket.gethostname() }_{ os.getpid() }"
+
+    queuefx.create_queue_tables()
+    queuefx.enqueue_seasons(range(season_stop, season + 1))
+
+    while True:
+        # Requeue seasons held by workers that stopped, and mark failed any that are out of attempts
+        queuefx.requeue_expired()
+
+        claimed_season = queuefx.claim_season(worker_id)
+        if claimed_season is None:
+            print(f"Worker { worker_id }: no seasons left in the queue.")
+            break
+
+        stop_heartbeat, lease_lost = queuefx.start_heartbeat(worker_id, claimed_season)
+
+        try:
+            success = load_season(claimed_season, worker_id, lease_lost)
+        except Exception as e:
+            logging.error(f"Worker { worker_id }: error loading the { claimed_season } season: { e }")
+            print(f"Worker { worker_id }: error loading the { claimed_season } season: { e }")
+            success = False
+        finally:
+            stop_heartbeat.set()
+
+        if success:
+            queuefx.complete_season(worker_id, claimed_season)
+        else:
+            queuefx.release_season(worker_id, claimed_season)
+
+        sleep_between_seasons()
+
+    failed = queuefx.failed_seasons()
+    if failed:
+        logging.error(f"Worker { worker_id }: seasons that failed after { queuefx.max_attempts() } attempts: { failed }")
+        print(f"Worker { worker_id }: seasons that failed after { queuefx.max_attempts() } attempts: { failed }")
+
+
+
+if __name__ == "__main__":
+
+    # Make sure the player, team, and venue tables and load procedures exist
+    dbfx.create_dimension_tables()
+
+    if os.getenv('QUEUE_ENABLED', '0') == '1':
+        run_queue_worker()
+
+    else:
+        while season >= season_stop:
+            if not load_season(season):
+                break
+
+            season -= 1
+
+            sleep_between_seasons()
@@ -94,15 +94,36 @@ def getGameList(season):
 
 
 
-def downloadGameDetail(game_id, output_dir):
+def downloadGameDetail(game_id, output_dir, passthrough=False, compress=False, file_prefix=''):
     """
         This function downloads the game details for a specific game ID and saves it to a JSON file.
+
+        In passthrough mode the response is streamed straight to disk without being parsed
+        and serialized again, and the file is named by the game ID (gamePk) instead of the
+        game id string from the feed, since that would require parsing the feed.
         
         :param game_id: The unique identifier for the MLB game.
         :param output_dir: The directory where the game details JSON file will be saved.
+        :param passthrough: If True, save the response bytes as-is, named {file_prefix}{game_id}.json
+        :param compress: In passthrough mode, gzip the file as it is written (.json.gz)
+        :param file_prefix: In passthrough mode, prefix for the file name (e.g., '2025_')
     """
-    # Build the URL for this game and get game data
+    # Build the URL for this game
     game_url = f'https://statsapi.mlb.com/api/v1.1/game/{game_id}/feed/live/'
+
+    if not output_dir.endswith("\\"):
+        output_dir += "\\"
+
+    if passthrough:
+        output_dir += f"{ file_prefix }{ game_id }.json" + (".gz" if compress else "")
+
+        # Stream the game feed to a file
+        if not utilfx.try_download_file(game_url, output_dir, retries=5, pause_minutes=3, compress=compress):
+            print(f"downloadGameDetail(): Failed to retrieve game data for game ID: {game_id}. Exiting.")
+            return False
+
+        return True
+
     game_data = utilfx.try_get_json(game_url, retries=5, pause_minutes=3)
 
     if game_data is None:
@@ -111,8 +132,6 @@ def downloadGameDetail(game_id, output_dir):
 
     game_id_string = game_data["gameData"]["game"]["id"].replace("/", "_").replace("-", "_")
     
-    if not output_dir.endswith("\\"):
-        output_dir += "\\"
     output_dir += f"{ game_id_string }.json"
 
     # Save the game feed to a file
@@ -122,13 +141,18 @@ def downloadGameDetail(game_id, output_dir):
     return True
 
 
-def getAtBats(file_path):
+def getAtBats(game_data):
+    """
+        This function retrieves at-bat data from a game feed.
+
+        :param game_data: The parsed game feed, or the path to the game detail JSON file.
+        :return: A list of dictionaries, each containing at-bat details.
+    """
 
     atBats = []
-    game_data = None
 
-    with open(file_path, 'r', encoding='utf-8') as f:
-        game_data = json.load(f) 
+    if isinstance(game_data, str):
+        game_data = utilfx.load_json(game_data)
     
     gameId = game_data['gamePk']
     
@@ -167,20 +191,19 @@ def getAtBats(file_path):
 
 
 
-def getPitches(file_path):
+def getPitches(game_data):
     """
-        This function retrieves pitch data from a game detail file. We're going to reuse the logic
-        from getAtBats to parse the file, and use the pitches if present in the atBats data
+        This function retrieves pitch data from a game feed. We're going to reuse the logic
+        from getAtBats to walk the feed, and use the pitches if present in the atBats data
         
-        :param file_path: The path to the game detail JSON file.
+        :param game_data: The parsed game feed, or the path to the game detail JSON file.
         :return: A list of dictionaries, each containing pitch details.
     """
 
     pitches = []
-    game_data = None
 
-    with open(file_path, 'r', encoding='utf-8') as f:
-        game_data = json.load(f) 
+    if isinstance(game_data, str):
+        game_data = utilfx.load_json(game_data)
     
     gameId = game_data['gamePk']
     
@@ -271,6 +294,103 @@ def getPitches(file_path):
 
 
 
+def getDimensions(game_data, seen):
+    """
+        This function extracts the players, teams, and venue from a game feed. Every game
+        feed already carries these in gameData, so there is no need for separate API calls.
+        Entities already loaded with the same values are skipped using the seen cache, so
+        only new or changed players, teams, and venues are returned.
+
+        :param game_data: The parsed game feed, or the path to the game detail JSON file.
+        :param seen: An OrderedDict used as an LRU cache of entities already loaded. The caller
+                     keeps it across games (and seasons), and adds entities to it with
+                     utilfx.mark_seen() once they have been loaded.
+        :return: A dictionary with 'players', 'teams', and 'venues' lists of dictionaries.
+    """
+
+    dimensions = {'players': [], 'teams': [], 'venues': []}
+
+    if isinstance(game_data, str):
+        game_data = utilfx.load_json(game_data)
+
+    # The feed timestamp is used as the last-modified value for everything in this file
+    lastModified = game_data.get('metaData', {}).get('timeStamp', None)
+    gameData = game_data['gameData']
+
+    # Players
+    for player in gameData.get('players', {}).values():
+        playerValues = {}
+        playerValues['playerId']               = player['id']
+        playerValues['fullName']               = player.get('fullName', 'NULL')
+        playerValues['firstName']              = player.get('firstName', 'NULL')
+        playerValues['lastName']               = player.get('lastName', 'NULL')
+        playerValues['useName']                = player.get('useName', 'NULL')
+        playerValues['boxscoreName']           = player.get('boxscoreName', 'NULL')
+        playerValues['primaryNumber']          = player.get('primaryNumber', 'NULL')
+        playerValues['birthDate']              = player.get('birthDate', 'NULL')
+        playerValues['birthCity']              = player.get('birthCity', 'NULL')
+        playerValues['birthStateProvince']     = player.get('birthStateProvince', 'NULL')
+        playerValues['birthCountry']           = player.get('birthCountry', 'NULL')
+        playerValues['height']                 = player.get('height', 'NULL')
+        playerValues['weight']                 = player.get('weight', 'NULL')
+        playerValues['active']                 = player.get('active', 'NULL')
+        playerValues['primaryPositionCode']    = player.get('primaryPosition', {}).get('code', 'NULL')
+        playerValues['batSide']                = player.get('batSide', {}).get('code', 'NULL')
+        playerValues['pitchHand']              = player.get('pitchHand', {}).get('code', 'NULL')
+        playerValues['mlbDebutDate']           = player.get('mlbDebutDate', 'NULL')
+
+        if utilfx.is_new_or_changed(seen, ('player', player['id']), lastModified, playerValues):
+            playerValues['lastModified'] = lastModified
+            dimensions['players'].append(playerValues)
+
+    # Teams. The team data is as of the game's season (names and cities change), so
+    # teams are keyed by id and season.
+    for team in gameData.get('teams', {}).values():
+        teamSeason = team.get('season', gameData.get('game', {}).get('season', None))
+        if teamSeason is None:
+            continue
+        teamValues = {}
+        teamValues['teamId']                   = team['id']
+        teamValues['season']                   = int(teamSeason)
+        teamValues['name']                     = team.get('name', 'NULL')
+        teamValues['teamName']                 = team.get('teamName', 'NULL')
+        teamValues['shortName']                = team.get('shortName', 'NULL')
+        teamValues['abbreviation']             = team.get('abbreviation', 'NULL')
+        teamValues['teamCode']                 = team.get('teamCode', 'NULL')
+        teamValues['locationName']             = team.get('locationName', 'NULL')
+        teamValues['firstYearOfPlay']          = team.get('firstYearOfPlay', 'NULL')
+        teamValues['leagueId']                 = team.get('league', {}).get('id', 'NULL')
+        teamValues['divisionId']               = team.get('division', {}).get('id', 'NULL')
+        teamValues['venueId']                  = team.get('venue', {}).get('id', 'NULL')
+        teamValues['active']                   = team.get('active', 'NULL')
+
+        if utilfx.is_new_or_changed(seen, ('team', team['id'], int(teamSeason)), lastModified, teamValues):
+            teamValues['lastModified'] = lastModified
+            dimensions['teams'].append(teamValues)
+
+    # Venue
+    venue = gameData.get('venue', None)
+    if venue is not None and venue.get('id', None) is not None:
+        venueValues = {}
+        venueValues['venueId']                 = venue['id']
+        venueValues['name']                    = venue.get('name', 'NULL')
+        venueValues['city']                    = venue.get('location', {}).get('city', 'NULL')
+        venueValues['stateAbbrev']             = venue.get('location', {}).get('stateAbbrev', 'NULL')
+        venueValues['country']                 = venue.get('location', {}).get('country', 'NULL')
+        venueValues['timeZone']                = venue.get('timeZone', {}).get('id', 'NULL')
+        venueValues['capacity']                = venue.get('fieldInfo', {}).get('capacity', 'NULL')
+        venueValues['turfType']                = venue.get('fieldInfo', {}).get('turfType', 'NULL')
+        venueValues['roofType']                = venue.get('fieldInfo', {}).get('roofType', 'NULL')
+        venueValues['active']                  = venue.get('active', 'NULL')
+
+        if utilfx.is_new_or_changed(seen, ('venue', venue['id']), lastModified, venueValues):
+            venueValues['lastModified'] = lastModified
+            dimensions['venues'].append(venueValues)
+
+    return dimensions
+
+
+
 
 
 def getGameTypes():
@@ -0,0 +1,375 @@
+"""
+    Lease-based work queue so several workers (on one or more machines) can share a
+    backfill. Each season is a work item. A worker claims a season, which gives it a
+    lease for QUEUE_LEASE_MINUTES. The worker renews the lease with heartbeats while it
+    works, and marks the season done when it finishes. A season that fails is put back
+    in the queue until it has been claimed QUEUE_MAX_ATTEMPTS times, after which it is
+    marked failed. If a worker stops sending heartbeats, its lease expires and the season
+    is handed to another worker.
+
+    The queue lives in the SQL Server database (dbo.WorkQueue and dbo.WorkLock). For
+    local testing, set QUEUE_SQLITE_PATH to use a SQLite file instead.
+
+    The raw staging tables are shared by all workers, so the steps that truncate and
+    load them are serialized with staging_lock(). Downloading and parsing run in parallel.
+"""
+
+import sqlite3
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+import dbfx
+
+
+
+QUEUE_TABLE = 'dbo.WorkQueue'
+LOCK_TABLE = 'dbo.WorkLock'
+
+
+def use_sqlite():
+    return bool(os.getenv('QUEUE_SQLITE_PATH'))
+
+
+def lease_minutes():
+    return int(os.getenv('QUEUE_LEASE_MINUTES', 10))  # Default to 10 if not set
+
+
+def max_attempts():
+    return int(os.getenv('QUEUE_MAX_ATTEMPTS', 3))  # Default to 3 if not set
+
+
+# Get connection to the queue database
+def connect_to_queue():
+    if use_sqlite():
+        # isolation_level=None so transactions are controlled explicitly with BEGIN IMMEDIATE
+        return sqlite3.connect(os.getenv('QUEUE_SQLITE_PATH'), timeout=30, isolation_level=None)
+
+    return dbfx.connect_to_db()
+
+
+def table_name(name):
+    # SQLite has no schemas, so dbo.WorkQueue becomes WorkQueue
+    return name.split('.')[-1] if use_sqlite() else name
+
+
+def now_sql():
+    return "datetime('now')" if use_sqlite() else "SYSUTCDATETIME()"
+
+
+def lease_expires_sql():
+    if use_sqlite():
+        return f"datetime('now', '{ lease_minutes():+d} minutes')"
+    return f"DATEADD(MINUTE, { lease_minutes() }, SYSUTCDATETIME())"
+
+
+def execute(sql, params=()):
+    """
+    Runs a statement against the queue database in its own transaction.
+
+    Returns:
+        list: Rows returned by the statement, or the row count in a one-item list
+              for statements that don't return rows.
+    """
+    conn = connect_to_queue()
+
+    try:
+        cursor = conn.cursor()
+        if use_sqlite():
+            cursor.execute("BEGIN IMMEDIATE")
+        if params:
+            cursor.execute(sql, params)
+        else:
+            cursor.execute(sql)
+        rows = cursor.fetchall() if cursor.description is not None else [cursor.rowcount]
+        if use_sqlite():
+            cursor.execute("COMMIT")
+        else:
+            conn.commit()
+        return rows
+    finally:
+        conn.close()
+
+
+def create_queue_tables():
+    """
+    Creates the work queue and lock tables if they don't already exist.
+    """
+    queue_table = table_name(QUEUE_TABLE)
+    lock_table = table_name(LOCK_TABLE)
+
+    if use_sqlite():
+        execute(f"""CREATE TABLE IF NOT EXISTS {queue_table} (
+                        season INTEGER PRIMARY KEY,
+                        status TEXT NOT NULL DEFAULT 'pending',
+                        workerId TEXT NULL,
+                        leaseExpires TEXT NULL,
+                        heartbeatTime TEXT NULL,
+                        attempts INTEGER NOT NULL DEFAULT 0)""")
+        execute(f"""CREATE TABLE IF NOT EXISTS {lock_table} (
+                        lockName TEXT PRIMARY KEY,
+                        workerId TEXT NULL,
+                        leaseExpires TEXT NULL)""")
+        return
+
+    # Every worker runs this at start-up, so serialize it with an application lock
+    dbfx.execute_with_app_lock('create_queue_tables', [
+        f"""IF OBJECT_ID('{queue_table}', 'U') IS NULL
+                CREATE TABLE {queue_table} (
+                    season INT NOT NULL PRIMARY KEY,
+                    status VARCHAR(10) NOT NULL DEFAULT 'pending',
+                    workerId VARCHAR(100) NULL,
+                    leaseExpires DATETIME2 NULL,
+                    heartbeatTime DATETIME2 NULL,
+                    attempts INT NOT NULL DEFAULT 0)""",
+        f"""IF OBJECT_ID('{lock_table}', 'U') IS NULL
+                CREATE TABLE {lock_table} (
+                    lockName VARCHAR(100) NOT NULL PRIMARY KEY,
+                    workerId VARCHAR(100) NULL,
+                    leaseExpires DATETIME2 NULL)"""])
+
+
+def insert_if_missing(table, key_col, key_value):
+    """
+    Inserts a row with only its key set, unless the key already exists. Safe to run from
+    several workers at once: on SQL Server the existence check holds a key-range lock
+    until the insert, and a duplicate key from a concurrent insert is ignored.
+    """
+    if use_sqlite():
+        execute(f"INSERT OR IGNORE INTO {table} ({key_col}) VALUES (?)", (key_value,))
+        return
+
+    try:
+        execute(f"""INSERT INTO {table} ({key_col})
+                    SELECT ? WHERE NOT EXISTS (SELECT 1 FROM {table} WITH (UPDLOCK, HOLDLOCK)
+                                               WHERE {key_col} = ?)""", (key_value, key_value))
+    except Exception as e:
+        if not dbfx.is_duplicate_error(e):
+            raise
+
+
+def enqueue_seasons(seasons):
+    """
+    Adds seasons to the queue as pending work. Seasons already in the queue are left as they are.
+
+    Args:
+        seasons (iterable): Season years, e.g. range(1935, 1959).
+    """
+    queue_table = table_name(QUEUE_TABLE)
+
+    for season in seasons:
+        insert_if_missing(queue_table, 'season', season)
+
+
+def claim_season(worker_id):
+    """
+    Claims the next available season for a worker. A season is available if it is pending,
+    or if it was claimed by a worker whose lease has expired (stalled work is requeued this way).
+    Newest seasons are handed out first, matching the order of the sequential backfill.
+
+    Args:
+        worker_id (str): Identifies the worker, e.g. 'host1_12345'.
+
+    Returns:
+        int or None: The claimed season, or None if there is no work left.
+    """
+    queue_table = table_name(QUEUE_TABLE)
+
+    available = f"""(status = 'pending' OR (status = 'claimed' AND leaseExpires < { now_sql() }))
+                    AND attempts < ?"""
+
+    if use_sqlite():
+        # BEGIN IMMEDIATE in execute() takes the write lock, so the select and update are atomic
+        sql = f"""UPDATE {queue_table}
+                  SET status = 'claimed', workerId = ?, leaseExpires = { lease_expires_sql() },
+                      heartbeatTime = { now_sql() }, attempts = attempts + 1
+                  WHERE season = (SELECT season FROM {queue_table} WHERE {available}
+                                  ORDER BY season DESC LIMIT 1)
+                  RETURNING season"""
+    else:
+        # READPAST skips rows being claimed by other workers instead of waiting on them
+        sql = f"""WITH next_season AS (
+                      SELECT TOP (1) * FROM {queue_table} WITH (UPDLOCK, READPAST, ROWLOCK)
+                      WHERE {available}
+                      ORDER BY season DESC)
+                  UPDATE next_season
+                  SET status = 'claimed', workerId = ?, leaseExpires = { lease_expires_sql() },
+                      heartbeatTime = { now_sql() }, attempts = attempts + 1
+                  OUTPUT inserted.season"""
+
+    params = (worker_id, max_attempts()) if use_sqlite() else (max_attempts(), worker_id)
+    rows = execute(sql, params)
+
+    if not rows:
+        return None
+    return rows[0][0]
+
+
+def heartbeat(worker_id, season):
+    """
+    Renews the lease on a season claimed by a worker, and on any locks the worker holds.
+
+    Returns:
+        bool: True if the worker still holds the season, False if the lease was lost.
+    """
+    queue_table = table_name(QUEUE_TABLE)
+    lock_table = table_name(LOCK_TABLE)
+
+    rows = execute(f"""UPDATE {queue_table}
+                       SET leaseExpires = { lease_expires_sql() }, heartbeatTime = { now_sql() }
+                       WHERE season = ? AND workerId = ? AND status = 'claimed'""", (season, worker_id))
+    renew_locks(worker_id)
+
+    return rows[0] > 0
+
+
+def renew_locks(worker_id):
+    """
+    Renews the leases on all locks held by a worker.
+    """
+    lock_table = table_name(LOCK_TABLE)
+
+    execute(f"UPDATE {lock_table} SET leaseExpires = { lease_expires_sql() } WHERE workerId = ?", (worker_id,))
+
+
+def complete_season(worker_id, season):
+    """
+    Marks a claimed season as done. Does nothing if the worker no longer holds the lease.
+    """
+    queue_table = table_name(QUEUE_TABLE)
+
+    execute(f"""UPDATE {queue_table} SET status = 'done', leaseExpires = NULL
+                WHERE season = ? AND workerId = ? AND status = 'claimed'""", (season, worker_id))
+
+
+def release_season(worker_id, season):
+    """
+    Puts a claimed season back in the queue after a failure, so it can be retried, or
+    marks it failed if it has already been claimed QUEUE_MAX_ATTEMPTS times.
+    """
+    queue_table = table_name(QUEUE_TABLE)
+
+    execute(f"""UPDATE {queue_table}
+                SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    workerId = NULL, leaseExpires = NULL
+                WHERE season = ? AND workerId = ? AND status = 'claimed'""", (max_attempts(), season, worker_id))
+
+
+def requeue_expired():
+    """
+    Puts seasons whose lease has expired back to pending, or marks them failed if they have
+    already been claimed QUEUE_MAX_ATTEMPTS times. claim_season() also picks up expired
+    seasons, but without this an exhausted season would stay claimed forever.
+
+    Returns:
+        int: The number of seasons requeued or marked failed.
+    """
+    queue_table = table_name(QUEUE_TABLE)
+
+    rows = execute(f"""UPDATE {queue_table}
+                       SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                           workerId = NULL, leaseExpires = NULL
+                       WHERE status = 'claimed' AND leaseExpires < { now_sql() }""", (max_attempts(),))
+    return rows[0]
+
+
+def failed_seasons():
+    """
+    Returns the seasons marked failed. To retry them, set status = 'pending' and
+    attempts = 0 in the queue table.
+    """
+    queue_table = table_name(QUEUE_TABLE)
+
+    rows = execute(f"SELECT season FROM {queue_table} WHERE status = 'failed' ORDER BY season DESC")
+    return [row[0] for row in rows]
+
+
+def acquire_lock(lock_name, worker_id):
+    """
+    Tries to take a named lock. The lock is held under a lease like a season, so a lock
+    held by a dead worker is released when its lease expires.
+
+    Returns:
+        bool: True if the lock was taken.
+    """
+    lock_table = table_name(LOCK_TABLE)
+
+    insert_if_missing(lock_table, 'lockName', lock_name)
+
+    rows = execute(f"""UPDATE {lock_table} SET workerId = ?, leaseExpires = { lease_expires_sql() }
+                       WHERE lockName = ?
+                         AND (workerId IS NULL OR workerId = ? OR leaseExpires < { now_sql() })""",
+                   (worker_id, lock_name, worker_id))
+    return rows[0] > 0
+
+
+def release_lock(lock_name, worker_id):
+    lock_table = table_name(LOCK_TABLE)
+
+    execute(f"""UPDATE {lock_table} SET workerId = NULL, leaseExpires = NULL
+                WHERE lockName = ? AND workerId = ?""", (lock_name, worker_id))
+
+
+@contextmanager
+def staging_lock(worker_id, lease_lost = None, poll_seconds = 5):
+    """
+    Holds the lock on the raw staging tables for the duration of a with block, and
+    yields True once it is held. If lease_lost is set while waiting, it stops waiting
+    and yields False without the lock. The lease may also be lost just as the lock is
+    taken, so the block should check lease_lost again before loading anything.
+    If worker_id is None (no queue in use), the block runs without locking.
+    """
+    if worker_id is None:
+        yield True
+        return
+
+    while not acquire_lock('staging', worker_id):
+        if lease_lost is not None and lease_lost.wait(poll_seconds):
+            yield False
+            return
+        elif lease_lost is None:
+            time.sleep(poll_seconds)
+
+    try:
+        yield True
+    finally:
+        release_lock('staging', worker_id)
+
+
+def start_heartbeat(worker_id, season):
+    """
+    Starts a background thread that calls heartbeat() for a claimed season every third of
+    the lease period. If the season has been taken by another worker, or no heartbeat has
+    succeeded for a whole lease period, the lease is considered lost. After that the thread
+    keeps renewing the worker's locks, so a lock held for a load in progress doesn't expire
+    under it, until stop_event is set.
+
+    Returns:
+        tuple: (stop_event, lease_lost) threading.Events. Set stop_event to stop the thread.
+               lease_lost is set when the lease is lost; the worker should stop working
+               on the season as soon as it sees it.
+    """
+    stop_event = threading.Event()
+    lease_lost = threading.Event()
+    interval_seconds = lease_minutes() * 60 / 3
+
+    def run():
+        last_success = time.monotonic()
+        while not stop_event.wait(interval_seconds):
+            try:
+                if lease_lost.is_set():
+                    renew_locks(worker_id)
+                elif heartbeat(worker_id, season):
+                    last_success = time.monotonic()
+                else:
+                    print(f"Worker {worker_id} lost the lease on the {season} season.")
+                    lease_lost.set()
+            except Exception as e:
+                print(f"Heartbeat failed for worker {worker_id}: {e}")
+                if not lease_lost.is_set() and time.monotonic() - last_success >= lease_minutes() * 60:
+                    print(f"Worker {worker_id} lost the lease on the {season} season.")
+                    lease_lost.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    return stop_event, lease_lost
@@ -4,6 +4,14 @@ import zipfile
 import glob
 import requests
 import time
+import gzip
+import json
+
+# orjson is optional. It parses large game feeds several times faster than json.
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 def move_files(source_dir, destination_dir, extension=None):
     """
@@ -70,4 +78,121 @@ def try_get_json(url, retries = 5, pause_minutes = 3):
         if attempt < retries:
             time.sleep(pause_minutes * 60)
     print(f"Failed to retrieve data from {url} after {retries} retries.")
-    return None
\ No newline at end of file
+    return None
+
+
+def try_download_file(url, file_path, retries = 5, pause_minutes = 3, compress = False,
+                      connect_timeout = 10, read_timeout = 60):
+    """
+    Attempts to download the response body from the specified URL straight to a file,
+    retrying on failure. The body is streamed to disk as-is, without being parsed.
+    The file is written under a temporary name and renamed when complete, so a failed
+    download never leaves a partial file behind.
+
+    Args:
+        url (str): The full URL to request.
+        file_path (str): Path of the file to write.
+        retries (int): Number of retry attempts.
+        pause_minutes (int): Minutes to pause between retries.
+        compress (bool): If True, gzip the body while writing it.
+        connect_timeout (int): Seconds to wait for the connection.
+        read_timeout (int): Seconds to wait for each read of the body, so a stalled
+                            download fails and is retried instead of hanging.
+
+    Returns:
+        bool: True if the file was downloaded, otherwise False.
+    """
+    temp_path = file_path + '.tmp'
+
+    for attempt in range(1, retries + 1):
+        try:
+            with requests.get(url, stream=True, timeout=(connect_timeout, read_timeout)) as response:
+                if response.status_code == 200:
+                    open_file = gzip.open if compress else open
+                    with open_file(temp_path, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=1024 * 1024):
+                            f.write(chunk)
+                    os.replace(temp_path, file_path)
+                    return True
+                else:
+                    print(f"Attempt {attempt}: Received status code {response.status_code}. Retrying...")
+        except Exception as e:
+            print(f"Attempt {attempt}: Error occurred - {e}. Retrying...")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        if attempt < retries:
+            time.sleep(pause_minutes * 60)
+    print(f"Failed to download {url} after {retries} retries.")
+    return False
+
+
+def load_json(file_path):
+    """
+    Loads a JSON file, which may be gzip compressed (.gz). Uses orjson if it is
+    installed, otherwise the standard json module.
+
+    Args:
+        file_path (str): Path of the JSON file.
+
+    Returns:
+        dict: The parsed JSON.
+    """
+    open_file = gzip.open if file_path.lower().endswith('.gz') else open
+
+    with open_file(file_path, 'rb') as f:
+        data = f.read()
+
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def entity_signature(values):
+    # Values are compared as strings so 1 and '1' from different loads match
+    return tuple(sorted((k, str(v)) for k, v in values.items()))
+
+
+def is_new_or_changed(cache, key, last_modified, values):
+    """
+    Checks an entity against an LRU cache of entities already loaded. An entity is new
+    or changed if its key hasn't been seen, or if its values differ from the cached copy
+    and it is at least as recent as the cached copy. The cache isn't updated here; call
+    mark_seen() once the entity has actually been loaded.
+
+    Args:
+        cache (OrderedDict): Cache of key -> (last_modified, values), owned by the caller.
+        key (hashable): Identifies the entity, e.g. ('player', 660271).
+        last_modified (str): Sortable timestamp of the source the entity came from.
+        values (dict): The entity's values, excluding the timestamp.
+
+    Returns:
+        bool: True if the entity should be loaded, otherwise False.
+    """
+    cached = cache.get(key)
+
+    if cached is not None:
+        cache.move_to_end(key)
+        cached_last_modified, cached_signature = cached
+        if cached_signature == entity_signature(values):
+            return False
+        if last_modified is not None and cached_last_modified is not None and last_modified < cached_last_modified:
+            return False
+
+    return True
+
+
+def mark_seen(cache, key, last_modified, values, max_size = 100000):
+    """
+    Records an entity in the LRU cache used by is_new_or_changed(), evicting the least
+    recently used entry if the cache is full.
+
+    Args:
+        cache (OrderedDict): Cache of key -> (last_modified, values), owned by the caller.
+        key (hashable): Identifies the entity, e.g. ('player', 660271).
+        last_modified (str): Sortable timestamp of the source the entity came from.
+        values (dict): The entity's values, excluding the timestamp.
+        max_size (int): Maximum number of entries kept in the cache.
+    """
+    cache[key] = (last_modified, entity_signature(values))
+    cache.move_to_end(key)
+    if len(cache) > max_size:
+        cache.popitem(last=False)